@@ -0,0 +1,88 @@
+# Benchmark of sharded /attendance/search: seeds a throwaway SQLite database with a multi-million-row
+# attendance table and times the sharded search with increasing ATTENDANCE_SEARCH_PARALLELISM. The speedup
+# is relative to the sharded path on a 1-thread pool; the per-employee path is timed once for reference.
+#
+#   python benchmark_attendance_search.py --employees 2000 --years 3
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--employees', type=int, default=2000)
+parser.add_argument('--years', type=int, default=3)
+parser.add_argument('--repeat', type=int, default=3)
+parser.add_argument('--db', default=os.path.join(tempfile.gettempdir(), 'attendance_search_benchmark.db'))
+args = parser.parse_args()
+
+if os.path.exists(args.db):
+    os.remove(args.db)
+# main reads the database URL at import time
+os.environ['DATABASE_URL'] = 'sqlite:///' + args.db
+
+from main import app  # noqa: E402
+
+
+def seed():
+    conn = sqlite3.connect(args.db)
+    locations = ['Bangalore', 'Hyderabad', 'Pune', 'Chennai']
+    companies = ['Acme', 'Globex', 'Initech']
+    conn.executemany(
+        "INSERT INTO employee (id, name, email, phone, role, level, clientCompany, location, employeeType, "
+        "reportsTo, skills, password_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(i, f"Employee {i}", f"employee{i}@example.com", "0000000000", "Engineer", 3,
+          companies[i % len(companies)], locations[i % len(locations)], 'A', None, "python", "x")
+         for i in range(1, args.employees + 1)]
+    )
+
+    start = date(date.today().year - args.years + 1, 1, 1)
+    days = [start + timedelta(days=i) for i in range((date.today() - start).days + 1)]
+    working = [day.strftime("%Y-%m-%d") for day in days if day.weekday() < 5]
+    statuses = ['PRESENT'] * 7 + ['WFH'] * 2 + ['ABSENT']
+    rng = random.Random(42)
+    conn.executemany(
+        "INSERT INTO attendance (empId, date, status) VALUES (?, ?, ?)",
+        ((emp_id, day, rng.choice(statuses)) for emp_id in range(1, args.employees + 1) for day in working)
+    )
+    conn.commit()
+    rows = conn.execute("SELECT count(*) FROM attendance").fetchone()[0]
+    conn.close()
+    return rows
+
+
+def main():
+    rows = seed()
+    print(f"{args.employees} employees, {rows} attendance rows, {os.cpu_count()} cores")
+
+    client = app.test_client()
+    payload = {"fromDate": f"{date.today().year - args.years + 1}-01-01", "toDate": date.today().strftime("%Y-%m-%d")}
+
+    def best_time():
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            response = client.post('/attendance/search', json=payload, headers={"x-api-key": "abcdef"})
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.get_data(as_text=True)
+        return min(timings)
+
+    app.config['ATTENDANCE_SEARCH_SHARDED'] = False
+    app.config['ATTENDANCE_SEARCH_PARALLELISM'] = 1
+    print(f"per-employee     best={best_time() * 1000:9.1f}ms")
+
+    app.config['ATTENDANCE_SEARCH_SHARDED'] = True
+    parallelism = 1
+    baseline = None
+    while parallelism <= max(1, os.cpu_count() or 1):
+        app.config['ATTENDANCE_SEARCH_PARALLELISM'] = parallelism
+        best = best_time()
+        baseline = baseline or best
+        print(f"parallelism={parallelism:<3} best={best * 1000:9.1f}ms speedup={baseline / best:5.2f}x")
+        parallelism *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# Benchmark of response formats: bytes on the wire and client parse time for each format and encoding.
+#
+#   python main.py
+#   python benchmark_formats.py --base-url http://127.0.0.1:5003 --path /employees
+import argparse
+import gzip
+import json
+import time
+import urllib.request
+
+import msgpack
+import zstandard
+
+API_KEY = "abcdef"
+
+FORMATS = [
+    'application/json',
+    'application/vnd.columnar+json',
+    'application/msgpack',
+    'application/vnd.columnar+msgpack',
+]
+ENCODINGS = ['identity', 'gzip', 'zstd']
+
+
+def fetch(url, accept, encoding):
+    req = urllib.request.Request(url, data=b"{}", method='POST', headers={
+        "x-api-key": API_KEY,
+        "Content-Type": "application/json",
+        "Accept": accept,
+        "Accept-Encoding": encoding,
+    })
+    with urllib.request.urlopen(req) as response:
+        return response.read(), response.headers.get('Content-Encoding', 'identity')
+
+
+def parse(body, accept, content_encoding):
+    if content_encoding == 'gzip':
+        body = gzip.decompress(body)
+    elif content_encoding == 'zstd':
+        body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    if accept.endswith('msgpack'):
+        return msgpack.unpackb(body)
+    return json.loads(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--base-url', default='http://127.0.0.1:5003')
+    parser.add_argument('--path', default='/employees')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    url = args.base_url + args.path
+
+    print(f"{'format':<34} {'encoding':<9} {'wire bytes':>12} {'parse ms':>10}")
+    for accept in FORMATS:
+        for encoding in ENCODINGS:
+            body, content_encoding = fetch(url, accept, encoding)
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                parse(body, accept, content_encoding)
+            parse_ms = (time.perf_counter() - start) * 1000 / args.repeat
+            print(f"{accept:<34} {content_encoding:<9} {len(body):>12} {parse_ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
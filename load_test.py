@@ -0,0 +1,123 @@
+# Load test for admission control: measures latency of a cheap endpoint while bulk imports run.
+# It registers a throwaway employee for the bulk imports and deletes it and its attendance afterwards;
+# still, prefer pointing the server at a scratch database (DATABASE_URL).
+#
+#   DATABASE_URL=sqlite:////tmp/load_test.db gunicorn -w 4 -b 127.0.0.1:5003 main:app
+#   python load_test.py --base-url http://127.0.0.1:5003
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+API_KEY = "abcdef"
+
+
+def post(url, payload=None, method='POST'):
+    body = json.dumps(payload or {}).encode()
+    req = urllib.request.Request(url, data=body, method=method,
+                                 headers={"x-api-key": API_KEY, "Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000
+
+
+def measure_cheap(base_url, emp_id, requests, concurrency):
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda _: post(f"{base_url}/employees/{emp_id}"), range(requests)))
+    latencies = [elapsed for status, elapsed in results if status == 200]
+    rejected = len(results) - len(latencies)
+    return latencies, rejected
+
+
+def bulk_import(base_url, emp_id, stop, statuses, batch, next_day):
+    # Every batch gets its own far-future dates so it is a real insert
+    while not stop.is_set():
+        with next_day["lock"]:
+            day = next_day["day"]
+            next_day["day"] += timedelta(days=batch)
+        records = [{"empId": emp_id, "date": (day + timedelta(days=i)).strftime("%Y-%m-%d"), "status": "PRESENT"}
+                   for i in range(batch)]
+        status, _ = post(f"{base_url}/attendance/bulk-add", {"attendance": records})
+        statuses.append(status)
+
+
+def register_throwaway_employee(base_url):
+    payload = {
+        "name": "Load Test", "email": f"load-test-{uuid.uuid4().hex}@example.com", "phone": "0000000000",
+        "role": "Load Test", "level": 1, "skills": "", "clientCompany": "Load Test", "location": "Load Test",
+        "password": uuid.uuid4().hex
+    }
+    req = urllib.request.Request(f"{base_url}/register", data=json.dumps(payload).encode(), method='POST',
+                                 headers={"x-api-key": API_KEY, "Content-Type": "application/json"})
+    with urllib.request.urlopen(req) as response:
+        return json.loads(response.read())["id"]
+
+
+def delete_throwaway_employee(base_url, emp_id):
+    # Deleting the employee removes its attendance from the dashboard rollup; then drop the rows themselves
+    post(f"{base_url}/employees/{emp_id}", method='DELETE')
+    post(f"{base_url}/query", {"query": f"DELETE FROM attendance WHERE empId = {int(emp_id)}"})
+
+
+def report(label, latencies, rejected):
+    print(f"{label:>12}: p50={percentile(latencies, 50):7.1f}ms p95={percentile(latencies, 95):7.1f}ms "
+          f"p99={percentile(latencies, 99):7.1f}ms mean={statistics.mean(latencies) * 1000:7.1f}ms "
+          f"rejected={rejected}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--base-url', default='http://127.0.0.1:5003')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--bulk-clients', type=int, default=8)
+    parser.add_argument('--batch', type=int, default=2000)
+    args = parser.parse_args()
+
+    emp_id = register_throwaway_employee(args.base_url)
+    try:
+        report("baseline", *measure_cheap(args.base_url, emp_id, args.requests, args.concurrency))
+
+        stop = threading.Event()
+        statuses = []
+        next_day = {"day": date(3000, 1, 1), "lock": threading.Lock()}
+        importers = [threading.Thread(target=bulk_import,
+                                      args=(args.base_url, emp_id, stop, statuses, args.batch, next_day))
+                     for _ in range(args.bulk_clients)]
+        for importer in importers:
+            importer.start()
+        try:
+            report("during bulk", *measure_cheap(args.base_url, emp_id, args.requests, args.concurrency))
+        finally:
+            stop.set()
+            for importer in importers:
+                importer.join()
+    finally:
+        delete_throwaway_employee(args.base_url, emp_id)
+
+    print(f"bulk imports: {statuses.count(201)} accepted, "
+          f"{statuses.count(429)} rejected (429), {statuses.count(503)} rejected (503)")
+    req = urllib.request.Request(f"{args.base_url}/admin/admission-stats", data=b"{}", method='POST',
+                                 headers={"x-api-key": API_KEY, "Content-Type": "application/json"})
+    with urllib.request.urlopen(req) as response:
+        print(json.dumps(json.loads(response.read()), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,114 @@
-from datetime import datetime, timedelta
+import bisect
+import fcntl
+import hashlib
+import itertools
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import zlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 from functools import wraps
 
-from flask import Flask, request, jsonify
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+import click
+import msgpack
+import numpy as np
+import zstandard
+
+from flask import Flask, request, jsonify, g, stream_with_context
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, verify_jwt_in_request
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import text
+from sqlalchemy import text, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_cors import CORS
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///employees.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///employees.db')
 app.config['JWT_SECRET_KEY'] = 'your_secret_key'  # Change this to a secure secret key
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)  # Token expires in 1 hour
+app.config['WORKING_WEEKMASK'] = '1111100'  # Mon-Fri, used by the working-day engine
+app.config['DIRECTORY_CACHE_PATH'] = os.path.join(app.instance_path, 'employee_directory.cache')
+app.config['HOLIDAY_GENERATION_PATH'] = os.path.join(app.instance_path, 'holiday_generation')
+app.config['ATTENDANCE_GENERATIONS_PATH'] = os.path.join(app.instance_path, 'attendance_generations')
+app.config['ATTENDANCE_SUMMARY_CACHE_BYTES'] = 32 * 1024 * 1024  # per worker
+app.config['ATTENDANCE_SUMMARY_MAX_YEARS'] = 5  # longer ranges in /attendance/<emp_id> bypass the cache
+
+# /attendance/search splits its date range and employee set into shards run on a thread pool of this size when
+# > 1, or when ATTENDANCE_SEARCH_SHARDED forces the sharded path (a 1-thread pool is the scaling baseline)
+app.config['ATTENDANCE_SEARCH_PARALLELISM'] = int(os.environ.get('ATTENDANCE_SEARCH_PARALLELISM', 1))
+app.config['ATTENDANCE_SEARCH_SHARDED'] = os.environ.get('ATTENDANCE_SEARCH_SHARDED') == '1'
+app.config['ATTENDANCE_SEARCH_DATE_SHARDS'] = 8  # date slices of the hot table; archives add one per year
+app.config['ATTENDANCE_SEARCH_EMPLOYEES_PER_SHARD'] = 500
+
+# Admission control: every request takes `weight` units of ADMISSION_CAPACITY while it runs, bounded per class
+# and optionally per route. Requests that can't be admitted wait in a bounded FIFO queue per class until
+# `timeout` seconds.
+# Limits are shared by all workers on the host through ADMISSION_STATE_PATH.
+app.config['ADMISSION_STATE_PATH'] = os.path.join(app.instance_path, 'admission_state')
+app.config['ADMISSION_MAX_HOLDERS'] = 1024  # admitted plus waiting requests across all workers
+app.config['ADMISSION_POLL_SECONDS'] = 0.005  # first re-check of a waiting request, doubling up to the max
+app.config['ADMISSION_POLL_MAX_SECONDS'] = 0.1
+app.config['ADMISSION_REAP_SECONDS'] = 1.0  # how often holders of dead workers are looked for
+app.config['ADMISSION_CAPACITY'] = 48
+app.config['ADMISSION_CLASSES'] = {
+    'read': {'weight': 1, 'concurrency': 16, 'queue': 64, 'timeout': 2.0},
+    'write': {'weight': 2, 'concurrency': 8, 'queue': 32, 'timeout': 5.0},
+    'admin': {'weight': 4, 'concurrency': 4, 'queue': 8, 'timeout': 5.0},
+    'bulk': {'weight': 8, 'concurrency': 2, 'queue': 4, 'timeout': 10.0},
+    # Change-feed requests hold their slot only while they query the log, not while they wait between polls
+    'feed': {'weight': 1, 'concurrency': 4, 'queue': 64, 'timeout': 2.0},
+}
+# Endpoints not listed here are 'read'
+app.config['ADMISSION_ROUTES'] = {
+    'register_employee': {'class': 'write'},
+    'update_employee': {'class': 'write'},
+    'delete_employee': {'class': 'write'},
+    'add_or_update_attendance': {'class': 'write'},
+    'delete_attendance': {'class': 'write'},
+    'create_request_approval': {'class': 'write'},
+    'update_request_status': {'class': 'write'},
+    'delete_pending_request': {'class': 'write'},
+    'add_holidays': {'class': 'write'},
+    'delete_holiday': {'class': 'write'},
+    'search_attendance': {'class': 'admin', 'concurrency': 2},
+    'execute_query': {'class': 'admin', 'concurrency': 1},
+    'bulk_register_employees': {'class': 'bulk'},
+    'bulk_add_attendance': {'class': 'bulk'},
+    'get_request_changes': {'class': 'feed'},
+    'stream_request_changes': {'class': 'feed'},
+}
+app.config['ADMISSION_EXEMPT'] = {'static', 'get_admission_stats'}
+
+# Mutating endpoints honour an Idempotency-Key header: the first response is stored and replayed on retries
+app.config['IDEMPOTENT_ENDPOINTS'] = {
+    'register_employee', 'bulk_register_employees', 'update_employee', 'delete_employee',
+    'add_or_update_attendance', 'bulk_add_attendance', 'delete_attendance',
+    'create_request_approval', 'update_request_status', 'delete_pending_request',
+    'add_holidays', 'delete_holiday', 'execute_query',
+}
+app.config['IDEMPOTENCY_TTL'] = timedelta(hours=24)
+# An in-flight claim expires after this lease so a retry can take over from a killed worker; the worker
+# running the request renews it every third of the lease, so a long request keeps its claim
+app.config['IDEMPOTENCY_LEASE'] = timedelta(seconds=15)
+app.config['IDEMPOTENCY_WAIT_SECONDS'] = 20  # how long a duplicate waits; stays under gunicorn's default 30s timeout
+app.config['IDEMPOTENCY_COMPACT_EVERY'] = 1000  # new keys per worker between bulk deletes of expired keys
+
+# Responses at least this large are compressed when the client accepts zstd or gzip
+app.config['COMPRESSION_MIN_BYTES'] = 1024
+
+# Request approval change feed: how often waiting clients re-check the log, and the longest long-poll wait
+app.config['CHANGE_FEED_POLL_SECONDS'] = 0.5
+app.config['CHANGE_FEED_MAX_WAIT_SECONDS'] = 25  # stays under gunicorn's default 30s timeout
+app.config['COMPRESSION_CHUNK_BYTES'] = 64 * 1024
 
 # Add CORS middleware
 CORS(app, supports_credentials=True)
@@ -73,11 +170,845 @@ class RequestApproval(db.Model):
         db.CheckConstraint("requestType IN ('WFH', 'LEAVE')", name='chk_request_type')
     )
 
-with app.app_context():
+# Inverted skill index: one row per (employee, normalized skill token)
+class EmployeeSkill(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    empId = db.Column(db.Integer, db.ForeignKey('employee.id'), nullable=False)
+    skill = db.Column(db.String(100), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('empId', 'skill', name='uq_emp_skill'),
+        db.Index('ix_employee_skill_skill', 'skill', 'empId'),
+    )
+
+    def __repr__(self):
+        return f"EmployeeSkill(empId={self.empId}, skill={self.skill})"
+
+
+def tokenize_skills(skills):
+    # Skills are free text like "Python, SQL / AWS"; split on common separators and normalize
+    if not skills:
+        return []
+    tokens = []
+    for token in re.split(r'[,;/|\n]+', skills):
+        token = ' '.join(token.strip().lower().split())
+        if token and token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def index_employee_skills(emp_id, skills):
+    # Replace the index rows of one employee; caller commits
+    EmployeeSkill.query.filter(EmployeeSkill.empId == emp_id).delete(synchronize_session=False)
+    db.session.add_all([EmployeeSkill(empId=emp_id, skill=token) for token in tokenize_skills(skills)])
+
+
+def rebuild_skill_index():
+    EmployeeSkill.query.delete(synchronize_session=False)
+    employees = db.session.query(Employee.id, Employee.skills).all()
+    for emp_id, skills in employees:
+        index_employee_skills(emp_id, skills)
+    db.session.commit()
+    return len(employees)
+
+
+@app.cli.command('rebuild-skill-index')
+def rebuild_skill_index_command():
+    """Rebuild the employee skill index from employee.skills, e.g. after raw /query writes."""
+    click.echo(f"Reindexed skills of {rebuild_skill_index()} employees")
+
+
+# Closed years of attendance are moved out of the hot table into attendance_archive_<year> tables
+class AttendanceArchive(db.Model):
+    year = db.Column(db.Integer, primary_key=True)
+    rowCount = db.Column(db.Integer, nullable=False)
+    archivedAt = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"AttendanceArchive(year={self.year}, rowCount={self.rowCount})"
+
+
+def attendance_archive_table(year):
+    name = f'attendance_archive_{year}'
+    if name in db.metadata.tables:
+        return db.metadata.tables[name]
+    return db.Table(
+        name,
+        db.Column('id', db.Integer, primary_key=True),
+        db.Column('empId', db.Integer, nullable=False),
+        db.Column('date', db.Date, nullable=False),
+        db.Column('status', db.String(10), nullable=False),
+        db.Column('requestId', db.Integer, nullable=True),
+        db.UniqueConstraint('empId', 'date', name=f'uq_emp_date_{year}')
+    )
+
+
+def archived_years(from_date=None, to_date=None):
+    query = db.session.query(AttendanceArchive.year)
+    if from_date:
+        query = query.filter(AttendanceArchive.year >= from_date.year)
+    if to_date:
+        query = query.filter(AttendanceArchive.year <= to_date.year)
+    return [year for (year,) in query.order_by(AttendanceArchive.year).all()]
+
+
+def is_attendance_archived(day):
+    return AttendanceArchive.query.get(day.year) is not None
+
+
+def query_attendance(emp_id, from_date, to_date):
+    # Query router: reads the hot table and only those archive tables the date range overlaps
+    records = Attendance.query.filter(
+        Attendance.empId == emp_id,
+        Attendance.date.between(from_date, to_date)
+    ).all()
+    for year in archived_years(from_date, to_date):
+        archive = attendance_archive_table(year)
+        records.extend(db.session.execute(
+            select(archive).where(archive.c.empId == emp_id, archive.c.date.between(from_date, to_date))
+        ).all())
+    return sorted(records, key=lambda record: record.date)
+
+
+def archive_attendance_year(year):
+    if year >= datetime.today().year:
+        raise ValueError(f"Year {year} is not closed yet")
+
+    year_start, year_end = date(year, 1, 1), date(year, 12, 31)
+    archive = attendance_archive_table(year)
+    archive.create(db.engine, checkfirst=True)
+    columns = ['id', 'empId', 'date', 'status', 'requestId']
+
+    try:
+        hot_count = Attendance.query.filter(Attendance.date.between(year_start, year_end)).count()
+        archived_before = db.session.execute(select(func.count()).select_from(archive)).scalar()
+
+        db.session.execute(archive.insert().from_select(
+            columns,
+            select(*[Attendance.__table__.c[column] for column in columns])
+            .where(Attendance.date.between(year_start, year_end))
+        ))
+        archived_after = db.session.execute(select(func.count()).select_from(archive)).scalar()
+        if archived_after - archived_before != hot_count:
+            raise RuntimeError(
+                f"Row count mismatch for {year}: {hot_count} hot rows, {archived_after - archived_before} archived"
+            )
+
+        deleted = Attendance.query.filter(Attendance.date.between(year_start, year_end)) \
+            .delete(synchronize_session=False)
+        if deleted != hot_count:
+            raise RuntimeError(f"Row count mismatch for {year}: {hot_count} hot rows, {deleted} deleted")
+
+        entry = AttendanceArchive.query.get(year)
+        if entry:
+            entry.rowCount = archived_after
+            entry.archivedAt = datetime.now()
+        else:
+            db.session.add(AttendanceArchive(year=year, rowCount=archived_after, archivedAt=datetime.now()))
+        db.session.commit()
+        return {"year": year, "movedRows": hot_count, "archivedRows": archived_after}
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+@app.cli.command('archive-attendance')
+@click.argument('years', nargs=-1, type=int)
+def archive_attendance_command(years):
+    """Move closed years of attendance into archive tables and verify row counts."""
+    if not years:
+        oldest = db.session.query(func.min(Attendance.date)).scalar()
+        if not oldest:
+            click.echo("No attendance to archive")
+            return
+        years = range(oldest.year, datetime.today().year)
+    for year in years:
+        result = archive_attendance_year(year)
+        click.echo(f"{result['year']}: moved {result['movedRows']} rows, {result['archivedRows']} rows in archive")
+
+
+# Holiday calendar per location, consumed by the working-day engine below
+class Holiday(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    location = db.Column(db.String(100), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('location', 'date', name='uq_location_date'),
+    )
+
+    def __repr__(self):
+        return f"Holiday(location={self.location}, date={self.date}, name={self.name})"
+
+
+def exclusive_file_lock(path):
+    # Host-wide lock held until the returned file is closed; use as a context manager
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lock = open(path, 'a+b')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+    except BaseException:
+        lock.close()
+        raise
+    return lock
+
+
+class SharedCounter:
+    # Array of 8-byte counters in an mmap'd file, shared by all workers on the host. Reads are lock-free;
+    # increment() and any read-modify-write done under locked() are serialized across processes.
+    COUNTER = struct.Struct('<q')
+
+    def __init__(self, path, slots=1):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.slots = slots
+        self.map = None
+
+    def locked(self):
+        # Map the file first: flock isn't reentrant across open files of the same process
+        self._counter_map()
+        return exclusive_file_lock(self.lock_path)
+
+    def _counter_map(self):
+        if self.map is None:
+            with exclusive_file_lock(self.lock_path):
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+                try:
+                    size = self.slots * self.COUNTER.size
+                    if os.fstat(fd).st_size < size:
+                        os.ftruncate(fd, size)
+                    self.map = mmap.mmap(fd, size)
+                finally:
+                    os.close(fd)
+        return self.map
+
+    def value(self, slot=0):
+        return self.COUNTER.unpack_from(self._counter_map(), slot * self.COUNTER.size)[0]
+
+    def set(self, slot, value):
+        # Caller holds locked()
+        self.COUNTER.pack_into(self._counter_map(), slot * self.COUNTER.size, value)
+
+    def add(self, slot, delta):
+        # Caller holds locked()
+        self.set(slot, self.value(slot) + delta)
+
+    def clear(self):
+        # Caller holds locked()
+        counter_map = self._counter_map()
+        counter_map[:] = bytes(len(counter_map))
+
+    def increment(self, slots=(0,)):
+        with self.locked():
+            for slot in slots:
+                self.add(slot, 1)
+
+
+# (location, year) -> datetime64[D] array of holidays. Holiday writes in any worker bump the shared
+# generation, and every worker drops its cached calendars when it sees a new generation.
+holiday_cache = {}
+holiday_cache_generation = {"value": None}
+holiday_generation = SharedCounter(app.config['HOLIDAY_GENERATION_PATH'])
+
+
+def invalidate_holiday_cache(location, year):
+    holiday_cache.pop((location, year), None)
+    holiday_generation.increment()
+
+
+def busday_calendar(location, from_year, to_year):
+    generation = holiday_generation.value()
+    if holiday_cache_generation["value"] != generation:
+        holiday_cache.clear()
+        holiday_cache_generation["value"] = generation
+
+    years = range(from_year, to_year + 1)
+    calendar_years = {year: holiday_cache.get((location, year)) for year in years}
+    missing = [year for year, holidays in calendar_years.items() if holidays is None]
+    if missing:
+        # One query fills every uncached year of the range
+        holidays = Holiday.query.filter(
+            Holiday.location == location,
+            Holiday.date.between(date(missing[0], 1, 1), date(missing[-1], 12, 31))
+        ).all()
+        by_year = {year: [] for year in missing}
+        for holiday in holidays:
+            if holiday.date.year in by_year:
+                by_year[holiday.date.year].append(holiday.date)
+        for year, dates in by_year.items():
+            calendar_years[year] = np.array(dates, dtype='datetime64[D]')
+            holiday_cache[(location, year)] = calendar_years[year]
+    holidays = np.concatenate([calendar_years[year] for year in years])
+    return np.busdaycalendar(weekmask=app.config['WORKING_WEEKMASK'], holidays=holidays)
+
+
+def count_working_days(location, from_date, to_date):
+    calendar = busday_calendar(location, from_date.year, to_date.year)
+    return int(np.busday_count(np.datetime64(from_date), np.datetime64(to_date + timedelta(days=1)), busdaycal=calendar))
+
+
+def working_dates(location, from_date, to_date):
+    calendar = busday_calendar(location, from_date.year, to_date.year)
+    days = np.arange(np.datetime64(from_date), np.datetime64(to_date + timedelta(days=1)), dtype='datetime64[D]')
+    return days[np.is_busday(days, busdaycal=calendar)].astype(object).tolist()
+
+
+def location_calendars(locations, from_date, to_date):
+    return {location: busday_calendar(location, from_date.year, to_date.year) for location in set(locations)}
+
+
+def working_day_stats(locations, owners, dates, from_date, to_date, calendars=None):
+    # locations: one entry per employee; owners/dates: employee index and date of every attendance record.
+    # Returns per-employee working days in the range and the number of them that are marked.
+    # Pass prebuilt calendars to call this outside the request thread.
+    if calendars is None:
+        calendars = location_calendars(locations, from_date, to_date)
+    locations = np.array(locations, dtype=object)
+    owners = np.array(owners, dtype=np.int64)
+    dates = np.array(dates, dtype='datetime64[D]')
+    working_days = np.zeros(len(locations), dtype=np.int64)
+    on_working_day = np.zeros(len(dates), dtype=bool)
+    record_locations = locations[owners]
+    end = np.datetime64(to_date + timedelta(days=1))
+
+    for location in set(locations.tolist()):
+        calendar = calendars[location]
+        working_days[locations == location] = np.busday_count(np.datetime64(from_date), end, busdaycal=calendar)
+        in_location = record_locations == location
+        on_working_day[in_location] = np.is_busday(dates[in_location], busdaycal=calendar)
+
+    marked_days = np.bincount(owners[on_working_day], minlength=len(locations))
+    return working_days, marked_days
+
+
+def employee_directory_record(employee):
+    return {
+        "id": employee.id,
+        "name": employee.name,
+        "email": employee.email,
+        "phone": employee.phone,
+        "role": employee.role,
+        "level": employee.level,
+        "reportsTo": employee.reportsTo,
+        "skills": employee.skills,
+        "employeeType": employee.employeeType,
+        "clientCompany": employee.clientCompany,
+        "location": employee.location
+    }
+
+
+class EmployeeDirectoryCache:
+    # Read-through snapshot of the employee directory shared by all workers on the host.
+    #
+    # <path>      snapshot: header (magic, generation, count), sorted index of (id, offset, length),
+    #             then the records as one JSON array so the whole directory can be served without decoding
+    # <path>.gen  8-byte generation counter, mmap'd by every worker and bumped on every employee write
+    #
+    # A snapshot is current when its generation equals the shared counter; otherwise the first reader
+    # rebuilds it from the database under a file lock and the other workers pick up the new file.
+    MAGIC = b'EMPDIR01'
+    HEADER = struct.Struct('<8sqq')
+    ENTRY = struct.Struct('<qqq')
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.local_lock = threading.Lock()
+        self.generation = SharedCounter(path + '.gen')
+        self.snapshot = None
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def invalidate(self):
+        self.generation.increment()
+
+    def _open_snapshot(self):
+        try:
+            with open(self.path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        if data[:len(self.MAGIC)] != self.MAGIC:
+            return None
+        return data
+
+    def _snapshot_generation(self, data):
+        return self.HEADER.unpack_from(data, 0)[1]
+
+    def _write_snapshot(self, generation):
+        records = [employee_directory_record(employee) for employee in Employee.query.order_by(Employee.id).all()]
+        blobs = [json.dumps(record, separators=(',', ':'), sort_keys=True).encode() for record in records]
+        # +1 for the opening bracket of the JSON array; each following record is preceded by a comma
+        offset = self.HEADER.size + self.ENTRY.size * len(records) + 1
+        index = bytearray()
+        for record, blob in zip(records, blobs):
+            index += self.ENTRY.pack(record['id'], offset, len(blob))
+            offset += len(blob) + 1
+
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, generation, len(records)))
+            f.write(index)
+            f.write(b'[' + b','.join(blobs) + b']')
+        os.replace(tmp_path, self.path)
+        self.rebuilds += 1
+
+    def _current(self, count_lookup=True):
+        generation = self.generation.value()
+        with self.local_lock:
+            if self.snapshot is not None and self._snapshot_generation(self.snapshot) == generation:
+                self.hits += count_lookup
+                return self.snapshot
+
+            # Another worker may have rebuilt it already
+            self.snapshot = self._open_snapshot()
+            if self.snapshot is not None and self._snapshot_generation(self.snapshot) == generation:
+                self.hits += count_lookup
+                return self.snapshot
+
+            self.misses += count_lookup
+            with exclusive_file_lock(self.lock_path):
+                generation = self.generation.value()
+                self.snapshot = self._open_snapshot()
+                if self.snapshot is None or self._snapshot_generation(self.snapshot) != generation:
+                    self._write_snapshot(generation)
+                    self.snapshot = self._open_snapshot()
+            return self.snapshot
+
+    def _records_start(self, data):
+        count = self.HEADER.unpack_from(data, 0)[2]
+        return self.HEADER.size + self.ENTRY.size * count
+
+    def get(self, emp_id):
+        # Ids arrive from JSON bodies and JWT identities as ints or numeric strings
+        try:
+            emp_id = int(emp_id)
+        except (TypeError, ValueError):
+            return None
+        data = self._current()
+        low, high = 0, self.HEADER.unpack_from(data, 0)[2]
+        while low < high:
+            middle = (low + high) // 2
+            entry_id, offset, length = self.ENTRY.unpack_from(data, self.HEADER.size + self.ENTRY.size * middle)
+            if entry_id == emp_id:
+                return json.loads(data[offset:offset + length])
+            if entry_id < emp_id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def all(self):
+        return json.loads(self.all_json())
+
+    def all_json(self):
+        # Raw JSON array of every directory record, ready to be sent as a response body
+        data = self._current()
+        return data[self._records_start(data):]
+
+    def json_chunks(self, chunk_size):
+        # The same array in slices of the mapped snapshot, so serving it never copies the whole directory.
+        # The snapshot is resolved now; the slices are read later, outside the request context.
+        data = self._current()
+        start = self._records_start(data)
+        return (data[offset:offset + chunk_size] for offset in range(start, len(data), chunk_size))
+
+    def stats(self):
+        # Reading the snapshot for its size is not a lookup; counting it would inflate the hit ratio
+        data = self._current(count_lookup=False)
+        lookups = self.hits + self.misses
+        return {
+            "pid": os.getpid(),
+            "generation": self._snapshot_generation(data),
+            "entries": self.HEADER.unpack_from(data, 0)[2],
+            "snapshotBytes": len(data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "rebuilds": self.rebuilds,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else None
+        }
+
+
+directory_cache = EmployeeDirectoryCache(app.config['DIRECTORY_CACHE_PATH'])
+
+
+# Thread pool for sharded attendance search, created lazily so each gunicorn worker gets its own
+attendance_search_executor = {"pool": None, "workers": 0, "lock": threading.Lock()}
+
+
+def attendance_search_pool():
+    workers = app.config['ATTENDANCE_SEARCH_PARALLELISM']
+    with attendance_search_executor["lock"]:
+        if attendance_search_executor["workers"] != workers:
+            if attendance_search_executor["pool"] is not None:
+                attendance_search_executor["pool"].shutdown(wait=False)
+            attendance_search_executor["pool"] = ThreadPoolExecutor(workers, thread_name_prefix='attendance-search')
+            attendance_search_executor["workers"] = workers
+        return attendance_search_executor["pool"]
+
+
+def attendance_search_shards(emp_ids, from_date, to_date):
+    # (table, from, to, employee ids) for equal date slices of the hot table and each overlapping archive
+    # year, crossed with chunks of the employee set
+    per_shard = app.config['ATTENDANCE_SEARCH_EMPLOYEES_PER_SHARD']
+    chunks = [emp_ids[i:i + per_shard] for i in range(0, len(emp_ids), per_shard)]
+
+    ranges = []
+    step = max(1, -(-((to_date - from_date).days + 1) // app.config['ATTENDANCE_SEARCH_DATE_SHARDS']))
+    start = from_date
+    while start <= to_date:
+        end = min(to_date, start + timedelta(days=step - 1))
+        ranges.append((Attendance.__table__, start, end))
+        start = end + timedelta(days=1)
+    for year in archived_years(from_date, to_date):
+        ranges.append((attendance_archive_table(year), max(from_date, date(year, 1, 1)), min(to_date, date(year, 12, 31))))
+
+    return [(table, start, end, chunk) for table, start, end in ranges for chunk in chunks]
+
+
+def count_attendance_shard(engine, shard, positions, locations, calendars, from_date, to_date):
+    # Runs on the search pool: its own pooled connection, no Flask context
+    table, shard_from, shard_to, emp_ids = shard
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(table.c.empId, table.c.date, table.c.status)
+            .where(table.c.empId.in_(emp_ids), table.c.date.between(shard_from, shard_to))
+        ).all()
+
+    owners = np.array([positions[row.empId] for row in rows], dtype=np.int64)
+    statuses = np.array([row.status for row in rows], dtype=object)
+    counts = {
+        status: np.bincount(owners[statuses == status], minlength=len(locations))
+        for status in ["PRESENT", "ABSENT", "WFH"]
+    }
+    _, counts["marked"] = working_day_stats(
+        locations, owners, [row.date for row in rows], from_date, to_date, calendars
+    )
+    return counts
+
+
+def sharded_attendance_counts(employees, from_date, to_date):
+    # Fans the shards out on the search pool and sums their partial per-employee counts
+    locations = [employee.location for employee in employees]
+    positions = {employee.id: index for index, employee in enumerate(employees)}
+    calendars = location_calendars(locations, from_date, to_date)
+    engine = db.engine
+    shards = attendance_search_shards([employee.id for employee in employees], from_date, to_date)
+
+    totals = {key: np.zeros(len(employees), dtype=np.int64) for key in ["PRESENT", "ABSENT", "WFH", "marked"]}
+    partials = attendance_search_pool().map(
+        lambda shard: count_attendance_shard(engine, shard, positions, locations, calendars, from_date, to_date),
+        shards
+    )
+    for partial in partials:
+        for key, counts in partial.items():
+            totals[key] += counts
+    return totals
+
+
+class AttendanceSummaryCache:
+    # Per-worker LRU of per-(employee, year) attendance summaries, bounded by an approximate memory budget.
+    #
+    # Entries are validated against generation counters in a shared mmap'd file: slot 0 is a global
+    # generation, every other slot is bumped by attendance writes for the (employee, year) hashing to it,
+    # so a write in one worker invalidates exactly the affected entries in all of them.
+    SLOTS = 65536
+
+    def __init__(self, path, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.local_lock = threading.Lock()
+        self.counters = SharedCounter(path, self.SLOTS)
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _slot(self, emp_id, year):
+        return 1 + (emp_id * 1000003 + year) % (self.SLOTS - 1)
+
+    def _generation(self, emp_id, year):
+        return self.counters.value(0), self.counters.value(self._slot(emp_id, year))
+
+    def invalidate(self, emp_id, years):
+        self.counters.increment({self._slot(emp_id, year) for year in years})
+
+    def invalidate_many(self, keys):
+        # keys: iterable of (emp_id, year)
+        self.counters.increment({self._slot(emp_id, year) for emp_id, year in keys})
+
+    def invalidate_all(self):
+        self.counters.increment()
+
+    def get(self, emp_id, year, build):
+        key = (emp_id, year)
+        generation = self._generation(emp_id, year)
+        with self.local_lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        summary = build()
+        # Rough CPython footprint: ~64 bytes per date string plus the dict overhead
+        size = 512 + 64 * sum(len(summary[status]) for status in ["PRESENT", "ABSENT", "WFH"])
+        with self.local_lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[2]
+            self.entries[key] = (generation, summary, size)
+            self.size += size
+            while self.size > self.budget_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted[2]
+                self.evictions += 1
+        return summary
+
+
+attendance_summaries = AttendanceSummaryCache(
+    app.config['ATTENDANCE_GENERATIONS_PATH'], app.config['ATTENDANCE_SUMMARY_CACHE_BYTES']
+)
+
+
+def build_attendance_summary(records):
+    summary = {"PRESENT": [], "ABSENT": [], "WFH": [], "monthly_absent": {}}
+    for record in records:
+        if record.status in summary:
+            summary[record.status].append(record.date.strftime("%Y-%m-%d"))
+        if record.status == "ABSENT":
+            summary["monthly_absent"][record.date.month] = summary["monthly_absent"].get(record.date.month, 0) + 1
+    return summary
+
+
+def attendance_year_summary(emp_id, year):
+    # Sorted date strings per status for one employee and year, plus the monthly ABSENT breakdown
+    return attendance_summaries.get(
+        emp_id, year, lambda: build_attendance_summary(query_attendance(emp_id, date(year, 1, 1), date(year, 12, 31)))
+    )
+
+
+# Monotonic log of request approval changes; seq orders the feed
+class RequestChange(db.Model):
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    requestId = db.Column(db.Integer, nullable=False)
+    changeType = db.Column(db.String(10), nullable=False)
+    requesterEmpId = db.Column(db.Integer, nullable=False)
+    approverEmpId = db.Column(db.Integer, nullable=False)
+    requestType = db.Column(db.String(100), nullable=False)
+    requestStatus = db.Column(db.String(10), nullable=False)
+    fromDate = db.Column(db.Date, nullable=False)
+    toDate = db.Column(db.Date, nullable=False)
+    changedAt = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.CheckConstraint("changeType IN ('CREATED', 'UPDATED', 'DELETED')", name='chk_change_type'),
+        db.Index('ix_request_change_approver', 'approverEmpId', 'seq'),
+        db.Index('ix_request_change_requester', 'requesterEmpId', 'seq'),
+    )
+
+    def __repr__(self):
+        return f"RequestChange(seq={self.seq}, requestId={self.requestId}, changeType={self.changeType})"
+
+
+def record_request_change(request_approval, change_type):
+    # Caller commits, so the change is logged in the same transaction as the request itself
+    db.session.add(RequestChange(
+        requestId=request_approval.id,
+        changeType=change_type,
+        requesterEmpId=request_approval.requesterEmpId,
+        approverEmpId=request_approval.approverEmpId,
+        requestType=request_approval.requestType,
+        requestStatus=request_approval.requestStatus,
+        fromDate=request_approval.fromDate,
+        toDate=request_approval.toDate,
+        changedAt=datetime.now()
+    ))
+
+
+def request_changes_after(emp_id, role, after_seq, limit=500):
+    query = RequestChange.query.filter(RequestChange.seq > after_seq)
+    if role == 'created':
+        query = query.filter(RequestChange.requesterEmpId == emp_id)
+    elif role == 'approval':
+        query = query.filter(RequestChange.approverEmpId == emp_id)
+    else:
+        query = query.filter((RequestChange.requesterEmpId == emp_id) | (RequestChange.approverEmpId == emp_id))
+    changes = [{
+        "seq": change.seq,
+        "changeType": change.changeType,
+        "changedAt": change.changedAt.strftime("%Y-%m-%dT%H:%M:%S"),
+        "request": {
+            "id": change.requestId,
+            "requesterEmpId": change.requesterEmpId,
+            "approverEmpId": change.approverEmpId,
+            "requestType": change.requestType,
+            "requestStatus": change.requestStatus,
+            "fromDate": change.fromDate.strftime("%Y-%m-%d"),
+            "toDate": change.toDate.strftime("%Y-%m-%d")
+        }
+    } for change in query.order_by(RequestChange.seq).limit(limit).all()]
+    # End the read transaction so the next poll sees newly committed changes
+    db.session.rollback()
+    return changes
+
+
+# Attendance counts per (date, clientCompany, location, status), maintained by every attendance write
+class AttendanceRollup(db.Model):
+    date = db.Column(db.Date, primary_key=True)
+    clientCompany = db.Column(db.String(100), primary_key=True)
+    location = db.Column(db.String(100), primary_key=True)
+    status = db.Column(db.String(10), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"AttendanceRollup(date={self.date}, clientCompany={self.clientCompany}, " \
+               f"location={self.location}, status={self.status}, count={self.count})"
+
+
+def rollup_delta(deltas, employee, day, status, delta):
+    # employee is a directory record; deltas accumulates {(date, clientCompany, location, status): delta}
+    if employee is None:
+        return
+    key = (day, employee["clientCompany"], employee["location"], status.upper())
+    deltas[key] = deltas.get(key, 0) + delta
+
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE; others fall back to update-then-insert
+UPSERT_INSERTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+
+def apply_rollup(deltas):
+    # One upsert per touched key, in the caller's transaction
+    table = AttendanceRollup.__table__
+    upsert_insert = UPSERT_INSERTS.get(db.engine.dialect.name)
+    for (day, client_company, location, status), delta in deltas.items():
+        if delta == 0:
+            continue
+        if upsert_insert is not None:
+            statement = upsert_insert(table).values(
+                date=day, clientCompany=client_company, location=location, status=status, count=delta
+            )
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=['date', 'clientCompany', 'location', 'status'],
+                set_={"count": table.c.count + statement.excluded.count}
+            ))
+            continue
+        updated = db.session.execute(table.update().where(
+            table.c.date == day, table.c.clientCompany == client_company,
+            table.c.location == location, table.c.status == status
+        ).values(count=table.c.count + delta)).rowcount
+        if not updated:
+            db.session.execute(table.insert().values(
+                date=day, clientCompany=client_company, location=location, status=status, count=delta
+            ))
+
+
+def employee_rollup_deltas(emp_id, employee, sign):
+    # Adds (sign=1) or removes (sign=-1) all attendance of one employee under the given directory record
+    deltas = {}
+    for day, status, count in employee_attendance_counts(emp_id):
+        rollup_delta(deltas, employee, day, status, sign * count)
+    return deltas
+
+
+def employee_attendance_counts(emp_id):
+    counts = db.session.query(Attendance.date, Attendance.status, func.count()) \
+        .filter(Attendance.empId == emp_id).group_by(Attendance.date, Attendance.status).all()
+    for year in archived_years():
+        archive = attendance_archive_table(year)
+        counts.extend(db.session.execute(
+            select(archive.c.date, archive.c.status, func.count())
+            .where(archive.c.empId == emp_id).group_by(archive.c.date, archive.c.status)
+        ).all())
+    return counts
+
+
+def rebuild_attendance_rollup():
+    # Recomputes the rollup from the hot and archived attendance; returns how many keys had drifted
+    sources = [Attendance.__table__] + [attendance_archive_table(year) for year in archived_years()]
+    employee = Employee.__table__
+    fresh = {}
+    for source in sources:
+        rows = db.session.execute(
+            select(source.c.date, employee.c.clientCompany, employee.c.location, source.c.status, func.count())
+            .join(employee, employee.c.id == source.c.empId)
+            .group_by(source.c.date, employee.c.clientCompany, employee.c.location, source.c.status)
+        ).all()
+        for day, client_company, location, status, count in rows:
+            key = (day, client_company, location, status)
+            fresh[key] = fresh.get(key, 0) + count
+
+    current = {
+        (row.date, row.clientCompany, row.location, row.status): row.count
+        for row in AttendanceRollup.query.all()
+    }
+    drifted = sum(1 for key in set(fresh) | set(current) if fresh.get(key, 0) != current.get(key, 0))
+
+    AttendanceRollup.query.delete(synchronize_session=False)
+    db.session.add_all([
+        AttendanceRollup(date=day, clientCompany=client_company, location=location, status=status, count=count)
+        for (day, client_company, location, status), count in fresh.items()
+    ])
+    db.session.commit()
+    return drifted, len(fresh)
+
+
+@app.cli.command('rebuild-attendance-rollup')
+def rebuild_attendance_rollup_command():
+    """Recompute the attendance dashboard rollup from attendance records."""
+    drifted, keys = rebuild_attendance_rollup()
+    click.echo(f"Rebuilt {keys} rollup keys, {drifted} had drifted")
+
+
+class IdempotencyKey(db.Model):
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    state = db.Column(db.String(12), nullable=False)
+    responseStatus = db.Column(db.Integer, nullable=True)
+    responseBody = db.Column(db.LargeBinary, nullable=True)
+    responseMimetype = db.Column(db.String(100), nullable=True)
+    createdAt = db.Column(db.DateTime, nullable=False)
+    expiresAt = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.CheckConstraint("state IN ('IN_PROGRESS', 'COMPLETED')", name='chk_idempotency_state'),
+    )
+
+    def __repr__(self):
+        return f"IdempotencyKey(key={self.key}, state={self.state})"
+
+
+def compact_idempotency_keys():
+    # Expired keys are removed in one statement rather than one by one
+    table = IdempotencyKey.__table__
+    with db.engine.begin() as conn:
+        return conn.execute(table.delete().where(table.c.expiresAt < datetime.now())).rowcount
+
+
+@app.cli.command('compact-idempotency-keys')
+def compact_idempotency_keys_command():
+    """Delete expired idempotency keys."""
+    click.echo(f"Deleted {compact_idempotency_keys()} expired idempotency keys")
+
+
+# Every gunicorn worker imports this module at once; the lock lets one of them create and backfill the
+# tables while the others wait, instead of all writing together and failing boot with "database is locked"
+with app.app_context(), exclusive_file_lock(os.path.join(app.instance_path, 'startup.lock')):
     db.create_all()
+    # Backfill the skill index for databases created before it existed
+    if EmployeeSkill.query.first() is None and Employee.query.first() is not None:
+        rebuild_skill_index()
+    # The database may have changed while no worker was running
+    directory_cache.invalidate()
+    if AttendanceRollup.query.first() is None and Attendance.query.first() is not None:
+        rebuild_attendance_rollup()
 
 
-def admin_required(fn):
+def admin_required(fn, jwt_locations=None):
     @wraps(fn)
     def wrapper(*args, **kwargs):
         api_key = request.headers.get("x-api-key")
@@ -88,13 +1019,13 @@ def admin_required(fn):
 
         # If no API key, try JWT
         try:
-            jwt_required()(lambda: None)()  # This will verify the JWT
+            jwt_required(locations=jwt_locations)(lambda: None)()  # This will verify the JWT
             current_user_id = get_jwt_identity()
 
             if not current_user_id:
                 return jsonify({"error": "Unauthorized"}), 401
 
-            employee = Employee.query.get(int(current_user_id))
+            employee = directory_cache.get(int(current_user_id))
             if not employee:
                 return jsonify({"error": "Unauthorized"}), 401
 
@@ -105,6 +1036,592 @@ def admin_required(fn):
 
     return wrapper
 
+
+def event_source_auth_required(fn):
+    # EventSource can't set headers, so streams also accept the JWT as ?jwt=<token>
+    return admin_required(fn, jwt_locations=['headers', 'query_string'])
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code, message, retry_after):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    # Host-wide admission state in a SharedCounter, only changed under its lock. Every decision reads running
+    # totals, so admitting or releasing a request touches a handful of slots instead of scanning all holders:
+    #
+    #   header   layout checksum, used capacity, free holder list, holders ever allocated, last reap time
+    #   classes  per class: admitted, queued, rejectedQueueFull, rejectedTimeout counters, active and waiting
+    #            totals, and the head/tail tickets of its wait queue
+    #   routes   active requests per route
+    #   queues   per class ring of waiting holders, indexed by ticket
+    #   holders  one entry per admitted or waiting request: pid, state, class, route, ticket, next free
+    #
+    # Waiting requests are admitted in ticket order within their class, and new arrivals queue behind them.
+    # Entries of processes that no longer exist (e.g. workers killed by a gunicorn timeout) are reaped every
+    # reap_seconds or when no holder entry is free, so a lost request never keeps its capacity.
+    HEADER_FIELDS = ["layout", "used", "freeHead", "allocated", "reapedAt"]
+    CLASS_FIELDS = ["admitted", "queued", "rejectedQueueFull", "rejectedTimeout", "active", "waiting", "head", "tail"]
+    HOLDER_FIELDS = ["pid", "state", "class", "route", "ticket", "nextFree"]
+    FREE, ACTIVE, WAITING = 0, 1, 2
+
+    def __init__(self, path, capacity, classes, routes, max_holders, poll_seconds, max_poll_seconds, reap_seconds):
+        self.capacity = capacity
+        self.classes = classes
+        self.routes = routes
+        self.max_holders = max_holders
+        self.poll_seconds = poll_seconds
+        self.max_poll_seconds = max_poll_seconds
+        self.reap_seconds = reap_seconds
+        self.class_names = sorted(classes)
+        self.route_names = sorted(routes)
+        self.classes_offset = len(self.HEADER_FIELDS)
+        self.routes_offset = self.classes_offset + len(self.CLASS_FIELDS) * len(self.class_names)
+        self.queues_offset = self.routes_offset + len(self.route_names)
+        self.holders_offset = self.queues_offset + max_holders * len(self.class_names)
+        self.layout = zlib.crc32(json.dumps([self.class_names, self.route_names, max_holders]).encode()) or 1
+        self.state = SharedCounter(path, self.holders_offset + len(self.HOLDER_FIELDS) * max_holders)
+
+    def _header(self, name):
+        return self.HEADER_FIELDS.index(name)
+
+    def _class_field(self, class_index, name):
+        return self.classes_offset + class_index * len(self.CLASS_FIELDS) + self.CLASS_FIELDS.index(name)
+
+    def _queue_field(self, class_index, ticket):
+        return self.queues_offset + class_index * self.max_holders + ticket % self.max_holders
+
+    def _holder_field(self, slot, name):
+        return self.holders_offset + slot * len(self.HOLDER_FIELDS) + self.HOLDER_FIELDS.index(name)
+
+    def _holder(self, slot, name):
+        return self.state.value(self._holder_field(slot, name))
+
+    def _locked(self):
+        lock = self.state.locked()
+        if self.state.value(self._header("layout")) != self.layout:
+            # First use on this host, or the classes/routes changed since the file was written
+            self.state.clear()
+            self.state.set(self._header("layout"), self.layout)
+        return lock
+
+    def _allocate(self):
+        state = self.state
+        free_head = state.value(self._header("freeHead"))
+        if free_head:
+            slot = free_head - 1
+            state.set(self._header("freeHead"), self._holder(slot, "nextFree"))
+            return slot
+        allocated = state.value(self._header("allocated"))
+        if allocated < self.max_holders:
+            state.set(self._header("allocated"), allocated + 1)
+            return allocated
+        return None
+
+    def _free(self, slot):
+        state = self.state
+        state.set(self._holder_field(slot, "pid"), 0)
+        state.set(self._holder_field(slot, "state"), self.FREE)
+        state.set(self._holder_field(slot, "nextFree"), state.value(self._header("freeHead")))
+        state.set(self._header("freeHead"), slot + 1)
+
+    def _set_holder(self, slot, holder_state, class_index, route_index, ticket=0):
+        for name, value in [("pid", os.getpid()), ("state", holder_state), ("class", class_index),
+                            ("route", route_index), ("ticket", ticket)]:
+            self.state.set(self._holder_field(slot, name), value)
+
+    def _activate(self, slot, class_index, route_index):
+        state = self.state
+        self._set_holder(slot, self.ACTIVE, class_index, route_index)
+        state.add(self._header("used"), self.classes[self.class_names[class_index]]['weight'])
+        state.add(self._class_field(class_index, "active"), 1)
+        state.add(self._class_field(class_index, "admitted"), 1)
+        if route_index >= 0:
+            state.add(self.routes_offset + route_index, 1)
+
+    def _deactivate(self, slot):
+        state = self.state
+        class_index, route_index = self._holder(slot, "class"), self._holder(slot, "route")
+        state.add(self._header("used"), -self.classes[self.class_names[class_index]]['weight'])
+        state.add(self._class_field(class_index, "active"), -1)
+        if route_index >= 0:
+            state.add(self.routes_offset + route_index, -1)
+
+    def _enqueue(self, slot, class_index, route_index):
+        state = self.state
+        ticket = state.value(self._class_field(class_index, "tail"))
+        self._set_holder(slot, self.WAITING, class_index, route_index, ticket)
+        state.set(self._queue_field(class_index, ticket), slot + 1)
+        state.set(self._class_field(class_index, "tail"), ticket + 1)
+        state.add(self._class_field(class_index, "waiting"), 1)
+        state.add(self._class_field(class_index, "queued"), 1)
+
+    def _dequeue(self, slot):
+        # Leaving the queue from the middle leaves a gap that the head skips once it gets there
+        state = self.state
+        class_index = self._holder(slot, "class")
+        state.set(self._queue_field(class_index, self._holder(slot, "ticket")), 0)
+        state.add(self._class_field(class_index, "waiting"), -1)
+        head = state.value(self._class_field(class_index, "head"))
+        tail = state.value(self._class_field(class_index, "tail"))
+        while head < tail and state.value(self._queue_field(class_index, head)) == 0:
+            head += 1
+        state.set(self._class_field(class_index, "head"), head)
+
+    def _reap(self, now_ms):
+        state = self.state
+        alive = {os.getpid(): True}
+        for slot in range(state.value(self._header("allocated"))):
+            holder_state = self._holder(slot, "state")
+            if holder_state == self.FREE:
+                continue
+            pid = self._holder(slot, "pid")
+            if pid not in alive:
+                try:
+                    os.kill(pid, 0)
+                    alive[pid] = True
+                except ProcessLookupError:
+                    alive[pid] = False
+                except PermissionError:
+                    alive[pid] = True
+            if alive[pid]:
+                continue
+            if holder_state == self.ACTIVE:
+                self._deactivate(slot)
+            else:
+                self._dequeue(slot)
+            self._free(slot)
+        state.set(self._header("reapedAt"), now_ms)
+
+    def _reap_if_due(self):
+        now_ms = int(time.monotonic() * 1000)
+        if now_ms - self.state.value(self._header("reapedAt")) >= self.reap_seconds * 1000:
+            self._reap(now_ms)
+
+    def _can_admit(self, class_index, route_index, route_limit):
+        state = self.state
+        limits = self.classes[self.class_names[class_index]]
+        if state.value(self._header("used")) + limits['weight'] > self.capacity:
+            return False
+        if state.value(self._class_field(class_index, "active")) >= limits['concurrency']:
+            return False
+        return route_limit is None or state.value(self.routes_offset + route_index) < route_limit
+
+    def acquire(self, endpoint):
+        route = self.routes.get(endpoint, {})
+        class_name = route.get('class', 'read')
+        class_index = self.class_names.index(class_name)
+        route_index = self.route_names.index(endpoint) if endpoint in self.routes else -1
+        route_limit = route.get('concurrency')
+        limits = self.classes[class_name]
+        retry_after = max(1, math.ceil(limits['timeout']))
+        state = self.state
+
+        with self._locked():
+            self._reap_if_due()
+            slot = self._allocate()
+            if slot is None:
+                self._reap(int(time.monotonic() * 1000))
+                slot = self._allocate()
+            if slot is None:
+                state.add(self._class_field(class_index, "rejectedQueueFull"), 1)
+                raise AdmissionRejected(503, "Server busy", retry_after)
+            waiting = state.value(self._class_field(class_index, "waiting"))
+            if waiting == 0 and self._can_admit(class_index, route_index, route_limit):
+                self._activate(slot, class_index, route_index)
+                return slot
+            queued_tickets = state.value(self._class_field(class_index, "tail")) - \
+                state.value(self._class_field(class_index, "head"))
+            if waiting >= limits['queue'] or queued_tickets >= self.max_holders:
+                self._free(slot)
+                state.add(self._class_field(class_index, "rejectedQueueFull"), 1)
+                raise AdmissionRejected(429, "Too many requests", retry_after)
+            self._enqueue(slot, class_index, route_index)
+
+        deadline = time.monotonic() + limits['timeout']
+        poll_seconds = self.poll_seconds
+        while True:
+            time.sleep(max(0.0, min(poll_seconds, deadline - time.monotonic())))
+            poll_seconds = min(poll_seconds * 2, self.max_poll_seconds)
+            with self._locked():
+                self._reap_if_due()
+                at_head = self._holder(slot, "ticket") == state.value(self._class_field(class_index, "head"))
+                if at_head and self._can_admit(class_index, route_index, route_limit):
+                    self._dequeue(slot)
+                    self._activate(slot, class_index, route_index)
+                    return slot
+                if time.monotonic() >= deadline:
+                    self._dequeue(slot)
+                    self._free(slot)
+                    state.add(self._class_field(class_index, "rejectedTimeout"), 1)
+                    raise AdmissionRejected(503, "Server busy", retry_after)
+
+    def release(self, slot):
+        with self._locked():
+            # The entry is gone if the state file was reset under this request
+            if self._holder(slot, "pid") == os.getpid() and self._holder(slot, "state") == self.ACTIVE:
+                self._deactivate(slot)
+                self._free(slot)
+
+    def stats(self):
+        state = self.state
+        with self._locked():
+            classes = {
+                name: {
+                    field: state.value(self._class_field(class_index, field))
+                    for field in self.CLASS_FIELDS if field not in ("head", "tail")
+                }
+                for class_index, name in enumerate(self.class_names)
+            }
+            return {"capacity": self.capacity, "used": state.value(self._header("used")), "classes": classes}
+
+
+admission = AdmissionController(
+    app.config['ADMISSION_STATE_PATH'], app.config['ADMISSION_CAPACITY'], app.config['ADMISSION_CLASSES'],
+    app.config['ADMISSION_ROUTES'], app.config['ADMISSION_MAX_HOLDERS'], app.config['ADMISSION_POLL_SECONDS'],
+    app.config['ADMISSION_POLL_MAX_SECONDS'], app.config['ADMISSION_REAP_SECONDS']
+)
+
+
+@app.before_request
+def admit_request():
+    if request.endpoint is None or request.endpoint in app.config['ADMISSION_EXEMPT']:
+        return None
+    try:
+        g.admission_ticket = admission.acquire(request.endpoint)
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    return None
+
+
+def admission_rejected_response(e):
+    response = jsonify({"error": str(e)})
+    response.status_code = e.status_code
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+
+def suspend_admission():
+    # Gives the admission slot back while the request sleeps; resume_admission() takes a new one
+    ticket = g.pop('admission_ticket', None)
+    if ticket is not None:
+        admission.release(ticket)
+    return ticket is not None
+
+
+def resume_admission():
+    g.admission_ticket = admission.acquire(request.endpoint)
+
+
+@app.teardown_request
+def release_admission(exc):
+    suspend_admission()
+
+
+# Row-oriented JSON is the default; the columnar shapes send column names once followed by one array per column
+RESPONSE_FORMATS = [
+    'application/json',
+    'application/vnd.columnar+json',
+    'application/msgpack',
+    'application/vnd.columnar+msgpack',
+]
+
+
+def negotiated_format():
+    return request.accept_mimetypes.best_match(RESPONSE_FORMATS, default='application/json')
+
+
+def columnar(rows):
+    columns = list(rows[0].keys()) if rows else []
+    return {"columns": columns, "values": [[row[column] for row in rows] for column in columns]}
+
+
+def coalesced(pieces):
+    # Joins small encoded pieces into chunks of about COMPRESSION_CHUNK_BYTES
+    chunk_size = app.config['COMPRESSION_CHUNK_BYTES']
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def json_pieces(rows, columnar_shape):
+    # Same encoding as jsonify, one row or column at a time
+    dumps = lambda value: app.json.dumps(value, separators=(',', ':')).encode()
+    if columnar_shape:
+        shape = columnar(rows)
+        yield b'{"columns":' + dumps(shape["columns"]) + b',"values":['
+        for index, values in enumerate(shape["values"]):
+            yield (b',' if index else b'') + dumps(values)
+        yield b']}'
+    else:
+        yield b'['
+        for index, row in enumerate(rows):
+            yield (b',' if index else b'') + dumps(row)
+        yield b']'
+
+
+def msgpack_pieces(rows, columnar_shape):
+    packer = msgpack.Packer(default=str)
+    if columnar_shape:
+        shape = columnar(rows)
+        yield packer.pack_map_header(2)
+        yield packer.pack("columns") + packer.pack(shape["columns"])
+        yield packer.pack("values") + packer.pack_array_header(len(shape["values"]))
+        for values in shape["values"]:
+            yield packer.pack(values)
+    else:
+        yield packer.pack_array_header(len(rows))
+        for row in rows:
+            yield packer.pack(row)
+
+
+def negotiated_response(rows, status=200):
+    # The body is encoded while it is sent (and compressed on the way by compress_response),
+    # so a large result is never held in memory as one serialized buffer
+    mimetype = negotiated_format()
+    columnar_shape = mimetype.startswith('application/vnd.columnar')
+    pieces = msgpack_pieces if mimetype.endswith('msgpack') else json_pieces
+    response = app.response_class(coalesced(pieces(rows, columnar_shape)), status=status, mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
+
+
+def compressed_chunks(chunks, encoding):
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor().compressobj()
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 writes a gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+# Registered before the idempotency hooks so it runs after them and stored responses stay uncompressed
+@app.after_request
+def compress_response(response):
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return response
+    if response.mimetype == 'text/event-stream':
+        return response  # Events must reach the client as they happen
+    if response.content_length is not None and response.content_length < app.config['COMPRESSION_MIN_BYTES']:
+        return response
+
+    encoding = request.accept_encodings.best_match(['zstd', 'gzip'])
+    if not encoding:
+        return response
+
+    # Streamed bodies are only read until they are known to be large enough to compress
+    chunks = response.iter_encoded()
+    head, size = [], 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= app.config['COMPRESSION_MIN_BYTES']:
+            break
+    else:
+        response.set_data(b''.join(head))
+        return response
+
+    response.response = compressed_chunks(itertools.chain(head, chunks), encoding)
+    response.headers.pop('Content-Length', None)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+idempotency_inserts = {"count": 0}
+# In-flight claims of this worker, renewed by a daemon thread started with the first claim
+idempotency_leases = {"claims": set(), "thread": None, "lock": threading.Lock()}
+
+
+def renew_idempotency_leases(engine):
+    table = IdempotencyKey.__table__
+    while True:
+        time.sleep(app.config['IDEMPOTENCY_LEASE'].total_seconds() / 3)
+        with idempotency_leases["lock"]:
+            claims = list(idempotency_leases["claims"])
+        if not claims:
+            continue
+        expires_at = datetime.now() + app.config['IDEMPOTENCY_LEASE']
+        try:
+            with engine.begin() as conn:
+                for key, claimed_at in claims:
+                    conn.execute(table.update().where(
+                        table.c.key == key, table.c.createdAt == claimed_at, table.c.state == 'IN_PROGRESS'
+                    ).values(expiresAt=expires_at))
+        except Exception:
+            # e.g. database locked; the lease still has two thirds left, try again next round
+            app.logger.exception("Renewing idempotency leases failed")
+
+
+def hold_idempotency_claim(claim):
+    with idempotency_leases["lock"]:
+        idempotency_leases["claims"].add(claim)
+        if idempotency_leases["thread"] is None:
+            idempotency_leases["thread"] = threading.Thread(
+                target=renew_idempotency_leases, args=(db.engine,), name='idempotency-leases', daemon=True
+            )
+            idempotency_leases["thread"].start()
+    g.idempotency_claim = claim
+
+
+def request_identity():
+    # Resolved the same way as admin_required, so a refreshed JWT of the same employee is the same caller
+    if request.headers.get("x-api-key") == "abcdef":
+        return "api-key"
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None  # Invalid or expired token; the endpoint answers 401, which is never stored
+    return f"employee:{identity}" if identity else ""
+
+
+def request_fingerprint():
+    # Includes the caller so a key can't replay another client's response
+    digest = hashlib.sha256()
+    for part in [request.method, request.full_path, request_identity(), request.headers.get("Accept", "")]:
+        digest.update(part.encode())
+        digest.update(b'\0')
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def replay_idempotent_response(row):
+    response = app.response_class(row.responseBody, status=row.responseStatus, mimetype=row.responseMimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+@app.before_request
+def check_idempotency_key():
+    key = request.headers.get('Idempotency-Key')
+    if not key or request.endpoint not in app.config['IDEMPOTENT_ENDPOINTS']:
+        return None
+
+    table = IdempotencyKey.__table__
+    fingerprint = request_fingerprint()
+    deadline = time.monotonic() + app.config['IDEMPOTENCY_WAIT_SECONDS']
+    released_ticket = False
+
+    while True:
+        # IN_PROGRESS claims expire after a short lease, COMPLETED entries after IDEMPOTENCY_TTL;
+        # an expired row of either kind is replaced by a new claim
+        now = datetime.now()
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(table.delete().where(table.c.key == key, table.c.expiresAt < now))
+                conn.execute(table.insert().values(
+                    key=key, fingerprint=fingerprint, state='IN_PROGRESS',
+                    createdAt=now, expiresAt=now + app.config['IDEMPOTENCY_LEASE']
+                ))
+            break
+        except IntegrityError:
+            pass
+
+        with db.engine.connect() as conn:
+            row = conn.execute(select(table).where(table.c.key == key)).first()
+        if row is None:
+            continue  # The in-flight request failed and released the key; claim it
+        if row.fingerprint != fingerprint:
+            return jsonify({"error": "Idempotency-Key was already used for a different request"}), 422
+        if row.state == 'COMPLETED':
+            return replay_idempotent_response(row)
+        if time.monotonic() >= deadline:
+            response = jsonify({"error": "A request with this Idempotency-Key is still in progress"})
+            response.status_code = 409
+            response.headers['Retry-After'] = '1'
+            return response
+
+        # Don't hold an admission slot while waiting for the in-flight request
+        released_ticket = suspend_admission() or released_ticket
+        time.sleep(0.05)
+
+    # createdAt identifies this claim, so a request whose lease was taken over can't touch the new claim
+    hold_idempotency_claim((key, now))
+    idempotency_inserts["count"] += 1
+    if idempotency_inserts["count"] % app.config['IDEMPOTENCY_COMPACT_EVERY'] == 0:
+        compact_idempotency_keys()
+
+    if released_ticket:
+        try:
+            resume_admission()
+        except AdmissionRejected as e:
+            release_idempotency_claim(g.pop('idempotency_claim'))
+            return admission_rejected_response(e)
+    return None
+
+
+def release_idempotency_claim(claim):
+    with idempotency_leases["lock"]:
+        idempotency_leases["claims"].discard(claim)
+    key, claimed_at = claim
+    table = IdempotencyKey.__table__
+    with db.engine.begin() as conn:
+        conn.execute(table.delete().where(table.c.key == key, table.c.createdAt == claimed_at))
+
+
+@app.after_request
+def store_idempotent_response(response):
+    claim = g.pop('idempotency_claim', None)
+    if not claim:
+        return response
+
+    if response.status_code >= 500 or response.status_code in (401, 429):
+        # Not a final answer; let the retry execute again
+        release_idempotency_claim(claim)
+        return response
+
+    with idempotency_leases["lock"]:
+        idempotency_leases["claims"].discard(claim)
+    key, claimed_at = claim
+    table = IdempotencyKey.__table__
+    with db.engine.begin() as conn:
+        conn.execute(table.update().where(table.c.key == key, table.c.createdAt == claimed_at).values(
+            state='COMPLETED',
+            responseStatus=response.status_code,
+            responseBody=response.get_data(),
+            responseMimetype=response.mimetype,
+            expiresAt=datetime.now() + app.config['IDEMPOTENCY_TTL']
+        ))
+    return response
+
+
+@app.teardown_request
+def release_idempotency_key(exc):
+    # Unhandled exceptions skip after_request; free the key so retries are not blocked until the lease lapses
+    claim = g.pop('idempotency_claim', None)
+    if claim:
+        release_idempotency_claim(claim)
+
+
+# API to report shared directory cache footprint and hit ratio of this worker
+@app.route('/admin/directory-cache-stats', methods=['POST'])
+def get_directory_cache_stats():
+    if request.headers.get("x-api-key") != "abcdef": return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(directory_cache.stats()), 200
+
+
+# API to expose admission control queue and reject counters
+@app.route('/admin/admission-stats', methods=['POST'])
+def get_admission_stats():
+    if request.headers.get("x-api-key") != "abcdef": return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(admission.stats()), 200
+
+
 # API to log in and get a JWT token
 @app.route('/login', methods=['POST'])
 def login():
@@ -154,7 +1671,10 @@ def register_employee():
             password_hash=hashed_password
         )
         db.session.add(employee)
+        db.session.flush()
+        index_employee_skills(employee.id, employee.skills)
         db.session.commit()
+        directory_cache.invalidate()
         return jsonify({"message": "Employee registered successfully", "id": employee.id}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -164,23 +1684,11 @@ def register_employee():
 @app.route('/employees/<int:emp_id>', methods=['POST'])
 @admin_required
 def get_employee_by_id(emp_id):
-    employee = Employee.query.get(emp_id)
+    employee = directory_cache.get(emp_id)
     if not employee:
         return jsonify({"error": "Employee not found"}), 404
 
-    return jsonify({
-        "id": employee.id,
-        "name": employee.name,
-        "email": employee.email,
-        "phone": employee.phone,
-        "role": employee.role,
-        "level": employee.level,
-        "reportsTo": employee.reportsTo,
-        "skills": employee.skills,
-        "employeeType": employee.employeeType,
-        "clientCompany": employee.clientCompany,
-        "location": employee.location
-    })
+    return jsonify(employee)
 
 
 # API to get all employees (Protected)
@@ -189,26 +1697,94 @@ def get_employee_by_id(emp_id):
 def get_all_employees():
     phone_number = request.args.get("phone")
     if phone_number:
-        employees = Employee.query.filter(Employee.phone == phone_number).all()
-    else:
-        employees = Employee.query.all()
-    response = [
-        {
-            "id": emp.id,
-            "name": emp.name,
-            "email": emp.email,
-            "phone": emp.phone,
-            "role": emp.role,
-            "level": emp.level,
-            "reportsTo": emp.reportsTo,
-            "skills": emp.skills,
-            "employeeType": emp.employeeType,
-            "clientCompany": emp.clientCompany,
-            "location": emp.location
+        response = [emp for emp in directory_cache.all() if emp["phone"] == phone_number]
+        return negotiated_response(response)
+    if negotiated_format() != 'application/json':
+        return negotiated_response(directory_cache.all())
+    # Served straight from the shared directory snapshot without decoding it
+    response = app.response_class(
+        directory_cache.json_chunks(app.config['COMPRESSION_CHUNK_BYTES']), mimetype='application/json'
+    )
+    response.vary.add('Accept')
+    return response
+
+
+# API to search employees by skills using the skill index (Protected)
+@app.route('/employees/search', methods=['POST'])
+@admin_required
+def search_employees_by_skills():
+    try:
+        data = request.json or {}
+        skills = data.get('skills', [])
+        if isinstance(skills, str):
+            skills = tokenize_skills(skills)
+        else:
+            skills = [token for skill in skills for token in tokenize_skills(skill)]
+        match = data.get('match', 'all').lower()  # 'all' (AND) or 'any' (OR)
+        if match not in ['all', 'any']:
+            return jsonify({"error": "Invalid match, expected 'all' or 'any'"}), 400
+
+        # Resolve matching employee ids: from the index when skills are given, otherwise from Employee alone
+        # so employees without any skills are not dropped by the join
+        if skills:
+            matched = db.session.query(EmployeeSkill.empId.label('empId')) \
+                .join(Employee, Employee.id == EmployeeSkill.empId) \
+                .filter(EmployeeSkill.skill.in_(skills))
+        else:
+            matched = db.session.query(Employee.id.label('empId'))
+        if data.get('role'):
+            matched = matched.filter(Employee.role == data['role'])
+        if data.get('level') is not None:
+            matched = matched.filter(Employee.level == data['level'])
+        if data.get('location'):
+            matched = matched.filter(Employee.location == data['location'])
+        if data.get('clientCompany'):
+            matched = matched.filter(Employee.clientCompany == data['clientCompany'])
+        if skills:
+            matched = matched.group_by(EmployeeSkill.empId)
+            if match == 'all':
+                matched = matched.having(func.count(func.distinct(EmployeeSkill.skill)) == len(set(skills)))
+        matched_ids = matched.subquery()
+
+        employees = Employee.query.filter(Employee.id.in_(db.session.query(matched_ids.c.empId))).all()
+
+        # Facet counts over the matched set
+        skill_facets = db.session.query(EmployeeSkill.skill, func.count(EmployeeSkill.empId)) \
+            .filter(EmployeeSkill.empId.in_(db.session.query(matched_ids.c.empId))) \
+            .group_by(EmployeeSkill.skill).all()
+        facets = {
+            "skills": {skill: count for skill, count in skill_facets},
+            "role": {},
+            "level": {},
+            "location": {},
+            "clientCompany": {}
         }
-        for emp in employees
-    ]
-    return jsonify(response)
+        for emp in employees:
+            for facet in ["role", "level", "location", "clientCompany"]:
+                value = getattr(emp, facet)
+                facets[facet][value] = facets[facet].get(value, 0) + 1
+
+        response = {
+            "employees": [
+                {
+                    "id": emp.id,
+                    "name": emp.name,
+                    "email": emp.email,
+                    "role": emp.role,
+                    "level": emp.level,
+                    "reportsTo": emp.reportsTo,
+                    "skills": emp.skills,
+                    "clientCompany": emp.clientCompany,
+                    "location": emp.location
+                }
+                for emp in employees
+            ],
+            "total": len(employees),
+            "facets": facets
+        }
+        return jsonify(response), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
 
 # API to update an employee (Protected)
@@ -221,13 +1797,24 @@ def update_employee(emp_id):
         return jsonify({"error": "Employee not found"}), 404
 
     try:
+        previous = employee_directory_record(employee)
         for key, value in data.items():
             if key == "password":
                 setattr(employee, "password_hash", generate_password_hash(value))
             else:
                 setattr(employee, key, value)
 
+        if 'skills' in data:
+            index_employee_skills(employee.id, employee.skills)
+        # Moving to another clientCompany/location moves the employee's attendance between rollup keys
+        current = employee_directory_record(employee)
+        if (previous["clientCompany"], previous["location"]) != (current["clientCompany"], current["location"]):
+            deltas = employee_rollup_deltas(emp_id, previous, -1)
+            for key, delta in employee_rollup_deltas(emp_id, current, 1).items():
+                deltas[key] = deltas.get(key, 0) + delta
+            apply_rollup(deltas)
         db.session.commit()
+        directory_cache.invalidate()
         return jsonify({"message": "Employee updated successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -242,8 +1829,11 @@ def delete_employee(emp_id):
         return jsonify({"error": "Employee not found"}), 404
 
     try:
+        EmployeeSkill.query.filter(EmployeeSkill.empId == emp_id).delete(synchronize_session=False)
+        apply_rollup(employee_rollup_deltas(emp_id, employee_directory_record(employee), -1))
         db.session.delete(employee)
         db.session.commit()
+        directory_cache.invalidate()
         return jsonify({"message": "Employee deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -287,8 +1877,13 @@ def bulk_register_employees():
             )
             new_employees.append(new_employee)
 
-        db.session.bulk_save_objects(new_employees)
+        # add_all + flush (instead of bulk_save_objects) so generated ids are available for the skill index
+        db.session.add_all(new_employees)
+        db.session.flush()
+        for new_employee in new_employees:
+            index_employee_skills(new_employee.id, new_employee.skills)
         db.session.commit()
+        directory_cache.invalidate()
         return jsonify({"message": "Employees registered successfully"}), 201
     except Exception as e:
         db.session.rollback()
@@ -302,11 +1897,17 @@ def add_or_update_attendance():
     data = request.json
     try:
         formatted_date = datetime.strptime(data['date'], "%Y-%m-%d").date()
+        if is_attendance_archived(formatted_date):
+            return jsonify({"error": f"Attendance for {formatted_date.year} is archived and read-only"}), 409
         existing_record = Attendance.query.filter_by(empId=data['empId'], date=formatted_date).first()
+        employee = directory_cache.get(data['empId'])
+        deltas = {}
 
         if existing_record and existing_record.status == data['status']:
             message = f"Attendance is already {data['status']}"
         elif existing_record and existing_record.status != data['status']:
+            rollup_delta(deltas, employee, formatted_date, existing_record.status, -1)
+            rollup_delta(deltas, employee, formatted_date, data['status'], 1)
             existing_record.status = data['status'].upper()
             message = f"Attendance record updated successfully to {data['status']}"
         else:
@@ -316,11 +1917,15 @@ def add_or_update_attendance():
                 status=data['status'].upper()
             )
             db.session.add(attendance)
+            rollup_delta(deltas, employee, formatted_date, data['status'], 1)
             message = "Attendance record added successfully"
 
+        apply_rollup(deltas)
         db.session.commit()
+        attendance_summaries.invalidate(int(data['empId']), [formatted_date.year])
         return jsonify({"message": message}), 201
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 400
 
 
@@ -365,36 +1970,31 @@ def get_attendance(emp_id):
         end_date = datetime.today().date()
     # Fetch attendance records for the employee within the specified date range
     print(start_date, end_date)
-    records = Attendance.query.filter(Attendance.empId == emp_id, Attendance.date >= start_date, Attendance.date <= end_date).all()
 
     # Initialize a dictionary to group dates by status
     attendance_by_status = {"PRESENT": [], "ABSENT": [], "WFH": []}
 
-    # Populate the dictionary with dates based on status
-    for record in records:
-        if record.status == "PRESENT":
-            attendance_by_status["PRESENT"].append(record.date.strftime("%Y-%m-%d"))
-        elif record.status == "ABSENT":
-            attendance_by_status["ABSENT"].append(record.date.strftime("%Y-%m-%d"))
-        elif record.status == "WFH":
-            attendance_by_status["WFH"].append(record.date.strftime("%Y-%m-%d"))
-
-    # Calculate leave statistics based on ABSENT records in Attendance table
+    if end_date.year - start_date.year < app.config['ATTENDANCE_SUMMARY_MAX_YEARS']:
+        # Slice the cached per-year summaries; ISO date strings sort chronologically
+        start_str, end_str = start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+        for year in range(start_date.year, end_date.year + 1):
+            summary = attendance_year_summary(emp_id, year)
+            for status, dates in attendance_by_status.items():
+                year_dates = summary[status]
+                dates.extend(year_dates[bisect.bisect_left(year_dates, start_str):
+                                        bisect.bisect_right(year_dates, end_str)])
+    else:
+        summary = build_attendance_summary(query_attendance(emp_id, start_date, end_date))
+        for status, dates in attendance_by_status.items():
+            dates.extend(summary[status])
+
+    # Calculate leave statistics based on ABSENT records of the current year
     current_year = datetime.today().year
-    absent_records = Attendance.query.filter(
-        Attendance.empId == emp_id,
-        Attendance.status == 'ABSENT',
-        db.extract('year', Attendance.date) == current_year
-    ).all()
+    current_summary = attendance_year_summary(emp_id, current_year)
 
     # Calculate total leaves taken and monthly breakdown
-    total_leaves = len(absent_records)
-    monthly_leaves = {}
-
-    for record in absent_records:
-        month = record.date.month
-        monthly_leaves.setdefault(month, 0)
-        monthly_leaves[month] += 1
+    total_leaves = len(current_summary["ABSENT"])
+    monthly_leaves = dict(current_summary["monthly_absent"])
 
     # Add remaining leave balance
     remaining_leaves = max(0, 24 - total_leaves)
@@ -418,7 +2018,7 @@ def get_attendance_by_date(emp_id):
     date = request.args.get('date')
     formatted_date = datetime.strptime(date, "%Y-%m-%d").date()
     # Fetch attendance records for the employee within the specified date range
-    records = Attendance.query.filter(Attendance.empId == emp_id, Attendance.date == formatted_date).all()
+    records = query_attendance(emp_id, formatted_date, formatted_date)
 
     print(records)
     if records:
@@ -439,6 +2039,8 @@ def delete_attendance(emp_id):
     try:
         # Convert date string to Date object
         date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
+        if is_attendance_archived(date_obj):
+            return jsonify({"error": f"Attendance for {date_obj.year} is archived and read-only"}), 409
 
         # Find the attendance record
         attendance = Attendance.query.filter_by(empId=emp_id, date=date_obj).first()
@@ -446,12 +2048,17 @@ def delete_attendance(emp_id):
             return jsonify({"error": "Attendance record not found"}), 404
 
         # Delete the record
+        deltas = {}
+        rollup_delta(deltas, directory_cache.get(emp_id), attendance.date, attendance.status, -1)
         db.session.delete(attendance)
+        apply_rollup(deltas)
         db.session.commit()
+        attendance_summaries.invalidate(emp_id, [date_obj.year])
 
         return jsonify({"message": "Attendance record deleted successfully"}), 200
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 400
 
 
@@ -465,8 +2072,11 @@ def bulk_add_attendance():
 
     try:
         new_records = []
+        closed_years = set(archived_years())
         for record in attendance_records:
             formatted_date = datetime.strptime(record['date'], "%Y-%m-%d").date()
+            if formatted_date.year in closed_years:
+                return jsonify({"error": f"Attendance for {formatted_date.year} is archived and read-only"}), 409
             new_attendance = Attendance(
                 empId=record['empId'],
                 date=formatted_date,
@@ -474,8 +2084,15 @@ def bulk_add_attendance():
             )
             new_records.append(new_attendance)
 
+        deltas = {}
+        employees = {emp_id: directory_cache.get(emp_id) for emp_id in {record.empId for record in new_records}}
+        for new_attendance in new_records:
+            rollup_delta(deltas, employees[new_attendance.empId], new_attendance.date, new_attendance.status, 1)
+
         db.session.bulk_save_objects(new_records)
+        apply_rollup(deltas)
         db.session.commit()
+        attendance_summaries.invalidate_many({(int(record.empId), record.date.year) for record in new_records})
         return jsonify({"message": "Attendance records added successfully"}), 201
     except Exception as e:
         db.session.rollback()
@@ -494,6 +2111,10 @@ def search_attendance():
         from_date = datetime.strptime(data.get('fromDate', '1900-01-01'), "%Y-%m-%d").date()
         to_date = datetime.strptime(data.get('toDate', '2100-12-31'), "%Y-%m-%d").date()
 
+        # Validate date range
+        if from_date > to_date:
+            return jsonify({"error": "Invalid date range"}), 400
+
         # Build employee query
         employee_query = Employee.query
 
@@ -510,36 +2131,74 @@ def search_attendance():
 
         current_year = datetime.today().year
         response = []
-
-        for employee in employees:
-            # Get attendance records for the date range
-            attendance_records = Attendance.query.filter(
-                Attendance.empId == employee.id,
-                Attendance.date.between(from_date, to_date)
-            ).all()
-
-            # Initialize counts
-            present_days = 0
-            absent_days = 0
-            wfh_days = 0
-
-            # Count statuses
-            for record in attendance_records:
-                if record.status == "PRESENT":
-                    present_days += 1
-                elif record.status == "ABSENT":
-                    absent_days += 1
-                elif record.status == "WFH":
-                    wfh_days += 1
-
-            # Calculate leaves taken this year (from ABSENT records)
-            leaves_taken = Attendance.query.filter(
-                Attendance.empId == employee.id,
-                Attendance.status == 'ABSENT',
-                db.extract('year', Attendance.date) == current_year
-            ).count()
-
+        locations = [employee.location for employee in employees]
+
+        sharded = app.config['ATTENDANCE_SEARCH_SHARDED'] or app.config['ATTENDANCE_SEARCH_PARALLELISM'] > 1
+        if sharded and employees:
+            counts = sharded_attendance_counts(employees, from_date, to_date)
+            working_days, _ = working_day_stats(locations, [], [], from_date, to_date)
+            marked_days = counts["marked"]
+
+            # Leaves taken this year for the whole result, one grouped query per chunk of employees
+            leaves = {}
+            per_shard = app.config['ATTENDANCE_SEARCH_EMPLOYEES_PER_SHARD']
+            emp_ids = [employee.id for employee in employees]
+            for i in range(0, len(emp_ids), per_shard):
+                leaves.update(db.session.query(Attendance.empId, func.count()).filter(
+                    Attendance.empId.in_(emp_ids[i:i + per_shard]),
+                    Attendance.status == 'ABSENT',
+                    Attendance.date.between(date(current_year, 1, 1), date(current_year, 12, 31))
+                ).group_by(Attendance.empId).all())
+            employee_stats = [
+                (int(counts["PRESENT"][index]), int(counts["ABSENT"][index]), int(counts["WFH"][index]),
+                 leaves.get(employee.id, 0))
+                for index, employee in enumerate(employees)
+            ]
+        else:
+            record_owners = []
+            record_dates = []
+            employee_stats = []
+
+            for index, employee in enumerate(employees):
+                # Get attendance records for the date range
+                attendance_records = query_attendance(employee.id, from_date, to_date)
+                record_owners.extend([index] * len(attendance_records))
+                record_dates.extend(record.date for record in attendance_records)
+
+                # Initialize counts
+                present_days = 0
+                absent_days = 0
+                wfh_days = 0
+
+                # Count statuses
+                for record in attendance_records:
+                    if record.status == "PRESENT":
+                        present_days += 1
+                    elif record.status == "ABSENT":
+                        absent_days += 1
+                    elif record.status == "WFH":
+                        wfh_days += 1
+
+                # Calculate leaves taken this year (from ABSENT records)
+                leaves_taken = Attendance.query.filter(
+                    Attendance.empId == employee.id,
+                    Attendance.status == 'ABSENT',
+                    db.extract('year', Attendance.date) == current_year
+                ).count()
+
+                employee_stats.append((present_days, absent_days, wfh_days, leaves_taken))
+
+            # Weekend and holiday aware statistics for the whole result in one vectorized pass
+            working_days, marked_days = working_day_stats(locations, record_owners, record_dates, from_date, to_date)
+
+        for index, employee in enumerate(employees):
+            present_days, absent_days, wfh_days, leaves_taken = employee_stats[index]
             remaining_leaves = max(0, 24 - leaves_taken)
+            attendance_percentage = 0.0
+            if working_days[index]:
+                attendance_percentage = min(
+                    100.0, round(100.0 * (present_days + wfh_days) / int(working_days[index]), 2)
+                )
 
             response.append({
                 "empId": employee.id,
@@ -551,7 +2210,10 @@ def search_attendance():
                     "PRESENT": present_days,
                     "ABSENT": absent_days,
                     "WFH": wfh_days,
-                    "totalDays": (to_date - from_date).days + 1
+                    "totalDays": (to_date - from_date).days + 1,
+                    "workingDays": int(working_days[index]),
+                    "unmarkedDays": int(working_days[index] - marked_days[index]),
+                    "attendancePercentage": attendance_percentage
                 },
                 "leaveStats": {
                     "leavesTaken": leaves_taken,
@@ -566,6 +2228,110 @@ def search_attendance():
         return jsonify({"error": str(e)}), 400
 
 
+# API for org-level attendance dashboards, answered from the rollup table
+@app.route('/attendance/dashboard', methods=['POST'])
+@admin_required
+def attendance_dashboard():
+    try:
+        data = request.json or {}
+        from_date = datetime.strptime(data.get('fromDate', '1900-01-01'), "%Y-%m-%d").date()
+        to_date = datetime.strptime(data.get('toDate', '2100-12-31'), "%Y-%m-%d").date()
+
+        query = AttendanceRollup.query.filter(
+            AttendanceRollup.date.between(from_date, to_date),
+            AttendanceRollup.count != 0
+        )
+        if data.get('clientCompany'):
+            query = query.filter(AttendanceRollup.clientCompany == data['clientCompany'])
+        if data.get('location'):
+            query = query.filter(AttendanceRollup.location == data['location'])
+
+        days = {}
+        totals = {"PRESENT": 0, "ABSENT": 0, "WFH": 0}
+        for row in query.order_by(AttendanceRollup.date).all():
+            key = (row.date, row.clientCompany, row.location)
+            if key not in days:
+                days[key] = {
+                    "date": row.date.strftime("%Y-%m-%d"),
+                    "clientCompany": row.clientCompany,
+                    "location": row.location,
+                    "PRESENT": 0,
+                    "ABSENT": 0,
+                    "WFH": 0
+                }
+            days[key][row.status] += row.count
+            totals[row.status] += row.count
+
+        return jsonify({"days": list(days.values()), "totals": totals}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+# API to add holidays for a location
+@app.route('/holidays', methods=['POST'])
+@admin_required
+def add_holidays():
+    data = request.json
+    holidays = data.get('holidays', [])
+    if not holidays:
+        return jsonify({"error": "No holidays provided"}), 400
+
+    try:
+        new_holidays = []
+        for holiday in holidays:
+            new_holidays.append(Holiday(
+                location=holiday['location'],
+                date=datetime.strptime(holiday['date'], "%Y-%m-%d").date(),
+                name=holiday['name']
+            ))
+        db.session.add_all(new_holidays)
+        db.session.commit()
+        for holiday in new_holidays:
+            invalidate_holiday_cache(holiday.location, holiday.date.year)
+        return jsonify({"message": "Holidays added successfully"}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+
+
+# API to list holidays, optionally filtered by location and year
+@app.route('/holidays/list', methods=['POST'])
+@admin_required
+def get_holidays():
+    query = Holiday.query
+    if request.args.get('location'):
+        query = query.filter(Holiday.location == request.args.get('location'))
+    if request.args.get('year'):
+        year = int(request.args.get('year'))
+        query = query.filter(Holiday.date.between(date(year, 1, 1), date(year, 12, 31)))
+
+    response = [{
+        "id": holiday.id,
+        "location": holiday.location,
+        "date": holiday.date.strftime("%Y-%m-%d"),
+        "name": holiday.name
+    } for holiday in query.order_by(Holiday.date).all()]
+    return jsonify(response), 200
+
+
+# API to delete a holiday
+@app.route('/holidays/<int:holiday_id>', methods=['DELETE'])
+@admin_required
+def delete_holiday(holiday_id):
+    holiday = Holiday.query.get(holiday_id)
+    if not holiday:
+        return jsonify({"error": "Holiday not found"}), 404
+
+    try:
+        db.session.delete(holiday)
+        db.session.commit()
+        invalidate_holiday_cache(holiday.location, holiday.date.year)
+        return jsonify({"message": "Holiday deleted successfully"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+
+
 # API to execute custom queries
 @app.route('/query', methods=['POST'])
 def execute_query():
@@ -586,8 +2352,11 @@ def execute_query():
             rows = result.fetchall()
             # Convert rows to a list of dictionaries
             response = [dict(row._mapping) for row in rows]
-            return jsonify(response)
+            return negotiated_response(response)
         else:
+            # Raw statements may have touched employees or attendance
+            directory_cache.invalidate()
+            attendance_summaries.invalidate_all()
             return jsonify({"message": "Query executed successfully"}), 200
 
     except Exception as e:
@@ -611,6 +2380,10 @@ def create_request_approval():
         if from_date > to_date:
             return jsonify({"error": "Invalid date range"}), 400
 
+        closed_years = archived_years(from_date, to_date)
+        if closed_years:
+            return jsonify({"error": f"Attendance for {closed_years[0]} is archived and read-only"}), 409
+
         # For LEAVE requests, check if employee has remaining leave balance
         if request_type == 'LEAVE':
             current_year = datetime.today().year
@@ -630,13 +2403,16 @@ def create_request_approval():
                 db.extract('year', RequestApproval.fromDate) == current_year
             ).all()
 
+            # Leave days are counted as working days of the employee's location
+            requester = directory_cache.get(emp_id)
+            requester_location = requester["location"] if requester else None
             total_pending_leaves = sum(
-                (req.toDate - req.fromDate).days + 1
+                count_working_days(requester_location, req.fromDate, req.toDate)
                 for req in pending_leaves
             )
 
             # Calculate requested leave days
-            requested_days = (to_date - from_date).days + 1
+            requested_days = count_working_days(requester_location, from_date, to_date)
 
             # Check if total would exceed 15 days
             if absent_days + total_pending_leaves + requested_days > 15:
@@ -676,14 +2452,14 @@ def create_request_approval():
             })
 
         # Get employee to find who they report to
-        employee = Employee.query.get(emp_id)
+        employee = directory_cache.get(emp_id)
         if not employee:
             return jsonify({"error": "Employee not found"}), 404
 
         # Create the request
         request_approval = RequestApproval(
             requesterEmpId=emp_id,
-            approverEmpId=employee.reportsTo,
+            approverEmpId=employee["reportsTo"],
             requestType=request_type.upper(),
             requestStatus="PENDING",
             requestCreatedDate=datetime.today().date(),
@@ -692,6 +2468,8 @@ def create_request_approval():
         )
 
         db.session.add(request_approval)
+        db.session.flush()
+        record_request_change(request_approval, 'CREATED')
         db.session.commit()
 
         return jsonify({
@@ -728,6 +2506,12 @@ def update_request_status(request_id):
             return jsonify({"error": "Unauthorized - Only approver can update status"}), 403
 
         # Handle approval with additional conflict checking
+        # Approving or rejecting an approved request writes attendance; the year may have been archived since
+        if new_status == 'APPROVED' or (new_status == 'REJECTED' and request_approval.requestStatus == 'APPROVED'):
+            closed_years = archived_years(request_approval.fromDate, request_approval.toDate)
+            if closed_years:
+                return jsonify({"error": f"Attendance for {closed_years[0]} is archived and read-only"}), 409
+
         if new_status == 'APPROVED':
             # Check for attendance conflicts that appeared after request creation
             existing_attendances = Attendance.query.filter(
@@ -744,29 +2528,42 @@ def update_request_status(request_id):
                     "message": "Please resolve conflicts before approving"
                 }), 409
 
-            # Add attendance records
-            delta = request_approval.toDate - request_approval.fromDate
-            for i in range(delta.days + 1):
-                current_date = request_approval.fromDate + timedelta(days=i)
-
+            # Add attendance records for working days only, so weekends and holidays don't count as leave
+            requester = directory_cache.get(request_approval.requesterEmpId)
+            status = 'WFH' if request_approval.requestType == 'WFH' else 'ABSENT'
+            deltas = {}
+            for current_date in working_dates(requester["location"] if requester else None,
+                                              request_approval.fromDate, request_approval.toDate):
                 attendance = Attendance(
                     empId=request_approval.requesterEmpId,
                     date=current_date,
-                    status='WFH' if request_approval.requestType == 'WFH' else 'ABSENT',
+                    status=status,
                     requestId=request_approval.id  # Track which request created this
                 )
                 db.session.add(attendance)
+                rollup_delta(deltas, requester, current_date, status, 1)
+            apply_rollup(deltas)
 
         # Handle rejection with cleanup
         elif new_status == 'REJECTED' and request_approval.requestStatus == 'APPROVED':
             # Delete only attendance records created by this request
+            requester = directory_cache.get(request_approval.requesterEmpId)
+            deltas = {}
+            for record in Attendance.query.filter(Attendance.requestId == request_approval.id).all():
+                rollup_delta(deltas, requester, record.date, record.status, -1)
             Attendance.query.filter(
                 Attendance.requestId == request_approval.id
             ).delete()
+            apply_rollup(deltas)
 
         # Update request status
         request_approval.requestStatus = new_status
+        record_request_change(request_approval, 'UPDATED')
         db.session.commit()
+        attendance_summaries.invalidate(
+            request_approval.requesterEmpId,
+            range(request_approval.fromDate.year, request_approval.toDate.year + 1)
+        )
 
         return jsonify({"message": "Request status updated successfully"}), 200
     except Exception as e:
@@ -825,11 +2622,80 @@ def get_requests():
             "toDate": req.toDate.strftime("%Y-%m-%d")
         } for req in requests]
 
-        return jsonify(response), 200
+        return negotiated_response(response)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 
+# API to get request changes after a sequence number, optionally waiting for new ones (long-poll)
+@app.route('/employees/<int:emp_id>/requests/changes', methods=['POST'])
+@admin_required
+def get_request_changes(emp_id):
+    try:
+        role = request.args.get('type', 'all')  # 'created', 'approval', or 'all'
+        after_seq = int(request.args.get('after', 0))
+        wait = min(float(request.args.get('wait', 0)), app.config['CHANGE_FEED_MAX_WAIT_SECONDS'])
+        deadline = time.monotonic() + wait
+
+        changes = request_changes_after(emp_id, role, after_seq)
+        while not changes and time.monotonic() < deadline:
+            suspend_admission()
+            time.sleep(app.config['CHANGE_FEED_POLL_SECONDS'])
+            try:
+                resume_admission()
+            except AdmissionRejected:
+                break  # Answer with no changes; the client polls again
+            changes = request_changes_after(emp_id, role, after_seq)
+
+        last_seq = changes[-1]["seq"] if changes else after_seq
+        return jsonify({"changes": changes, "lastSeq": last_seq}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+# API to stream request changes as Server-Sent Events
+@app.route('/employees/<int:emp_id>/requests/changes/stream', methods=['GET'])
+@event_source_auth_required
+def stream_request_changes(emp_id):
+    role = request.args.get('type', 'all')
+    # EventSource sends Last-Event-ID when it reconnects
+    try:
+        after_seq = int(request.headers.get('Last-Event-ID') or request.args.get('after', 0))
+    except ValueError:
+        return jsonify({"error": "Invalid Last-Event-ID or after"}), 400
+
+    def events():
+        # The stream ends after CHANGE_FEED_MAX_WAIT_SECONDS so it never outlives the worker timeout;
+        # EventSource reconnects on its own and resumes from Last-Event-ID
+        yield f"retry: {int(app.config['CHANGE_FEED_POLL_SECONDS'] * 1000)}\n\n"
+        last_seq = after_seq
+        idle = 0.0
+        deadline = time.monotonic() + app.config['CHANGE_FEED_MAX_WAIT_SECONDS']
+        while time.monotonic() < deadline:
+            changes = request_changes_after(emp_id, role, last_seq)
+            for change in changes:
+                last_seq = change["seq"]
+                yield f"id: {last_seq}\nevent: request-change\ndata: {json.dumps(change)}\n\n"
+            if changes:
+                idle = 0.0
+            else:
+                idle += app.config['CHANGE_FEED_POLL_SECONDS']
+                if idle >= 15:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    idle = 0.0
+                suspend_admission()
+                time.sleep(app.config['CHANGE_FEED_POLL_SECONDS'])
+                try:
+                    resume_admission()
+                except AdmissionRejected:
+                    return  # EventSource reconnects after the retry delay
+
+    response = app.response_class(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
 # API to get requests for specific user (based on their role)
 @app.route('/employees/<int:emp_id>/requests', methods=['POST'])
 @admin_required
@@ -890,8 +2756,8 @@ def delete_pending_request(request_id):
         current_user_id = int(get_jwt_identity())
         if current_user_id != request_approval.requesterEmpId:
             # Verify if user is admin (level 7-9) or the approver
-            current_user = Employee.query.get(current_user_id)
-            if not current_user or current_user.level < 7:
+            current_user = directory_cache.get(current_user_id)
+            if not current_user or current_user["level"] < 7:
                 if current_user_id != request_approval.approverEmpId:
                     return jsonify({
                         "error": "Unauthorized",
@@ -899,6 +2765,7 @@ def delete_pending_request(request_id):
                     }), 403
 
         # Delete the request
+        record_request_change(request_approval, 'DELETED')
         db.session.delete(request_approval)
         db.session.commit()
 